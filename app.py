@@ -1,19 +1,21 @@
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Request, Form, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Request, Form, WebSocket, WebSocketDisconnect
 from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from mcp_client_agent import MCPClient
-from session_manager import RedisSessionManager, ChatMessage
+from session_manager import RedisSessionManager
+from log_utils import setup_logging
 from dotenv import load_dotenv
-import asyncio
 import json
-import uuid
+import logging
 import os
-from datetime import datetime
 import typing
 # MCP state
 load_dotenv()
+# Queued console logging, so log writes happen off the request path
+log_level = getattr(logging, os.getenv("LOG_LEVEL", "INFO").upper(), None)
+setup_logging(log_level if isinstance(log_level, int) else logging.INFO)
 mcp_client = MCPClient()
 available_tools = []
 tool_session_map = {}
@@ -245,10 +247,7 @@ async def chat_with_agent(request: Request, user_input: str = Form(...), mcp_url
     try:
         # Add system prompt to the query processing if set
         if system_prompt:
-            # Temporarily modify the client's message handling to include system prompt
-            original_messages = mcp_client.messages.copy()
-            if not mcp_client.messages or mcp_client.messages[0].get("role") != "system":
-                mcp_client.messages.insert(0, {"role": "system", "content": system_prompt})
+            mcp_client.ensure_system_prompt(system_prompt)
         
         response = await mcp_client.process_user_query(
             available_tools=available_tools,
@@ -274,7 +273,6 @@ async def chat_with_agent(request: Request, user_input: str = Form(...), mcp_url
 
 # API endpoint for programmatic access
 from fastapi import Body
-from fastapi.responses import JSONResponse
 
 @app.post("/ask")
 async def ask_api(
@@ -309,10 +307,7 @@ async def ask_api(
     try:
         # Add system prompt to the query processing if set
         if system_prompt:
-            # Temporarily modify the client's message handling to include system prompt
-            original_messages = mcp_client.messages.copy()
-            if not mcp_client.messages or mcp_client.messages[0].get("role") != "system":
-                mcp_client.messages.insert(0, {"role": "system", "content": system_prompt})
+            mcp_client.ensure_system_prompt(system_prompt)
         
         response = await mcp_client.process_user_query(
             available_tools=available_tools,
@@ -1,23 +1,43 @@
 import asyncio
+import functools
+import hashlib
 import json
+import logging
 import os
-from typing import Any, Dict, List, Optional, Union
-from contextlib import asynccontextmanager
+import re
+import sys
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+from contextlib import AsyncExitStack, asynccontextmanager
 
+import httpx
+import orjson
+from aioconsole import ainput
 from mcp import ClientSession
 from mcp.client.sse import sse_client
 from dotenv import load_dotenv
+from log_utils import setup_logging
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Run LangChain callbacks (tracing, handlers) in the background instead of blocking each step
+os.environ.setdefault("LANGCHAIN_CALLBACKS_BACKGROUND", "true")
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
 # Try to import LangChain dependencies
 try:
     from langchain.agents import create_react_agent, AgentExecutor
     from langchain.tools import BaseTool
-    from langchain.memory import ConversationBufferWindowMemory
+    from langchain.memory import ConversationTokenBufferMemory
     from langchain_openai import AzureChatOpenAI, ChatOpenAI
     from langchain.prompts import PromptTemplate
-    from langchain import hub
     from pydantic import Field
     LANGCHAIN_AVAILABLE = True
     print("[INFO] LangChain is available")
@@ -33,6 +53,93 @@ except ImportError:
             pass
 
 
+# ReAct prompt; create_react_agent fills {tools} and {tool_names} once per agent build.
+# Everything before {chat_history} is identical across turns so providers can reuse the cached prefix.
+REACT_PROMPT_TEMPLATE = """
+Answer the following questions as best you can. You have access to the following tools:
+
+{tools}
+
+Use the following format:
+
+Question: the input question you must answer
+Thought: you should always think about what to do
+Action: the action to take, should be one of [{tool_names}]
+Action Input: the input to the action
+Observation: the result of the action
+... (this Thought/Action/Action Input/Observation can repeat N times)
+Thought: I now know the final answer
+Final Answer: the final answer to the original input question
+Use chat-history to keep context of the conversation.
+
+Chat history:
+{chat_history}
+
+Begin!
+
+Question: {input}
+Thought: {agent_scratchpad}
+"""
+
+# Placeholder returned for tool calls dispatched in the background
+FUTURE_PATTERN = re.compile(r"<future:([0-9a-f]+)>")
+
+
+def run_coroutine_sync(coro, loop: Optional[asyncio.AbstractEventLoop] = None):
+    """Run a coroutine to completion from synchronous code.
+
+    MCP sessions are bound to the event loop that opened them, so when that
+    loop is running elsewhere the coroutine is submitted to it from this
+    thread. Blocking the loop's own thread on it would deadlock, so that case
+    raises instead.
+    """
+    try:
+        running_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        running_loop = None
+
+    if loop is not None and loop.is_running() and loop is not running_loop:
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+    if running_loop is None:
+        return asyncio.run(coro)
+    coro.close()
+    raise RuntimeError(
+        "MCP tools cannot be run synchronously from inside a running event loop; "
+        "use ainvoke()/arun() instead"
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _token_encoding():
+    """cl100k_base encoding, or None if tiktoken or its encoding files are unavailable"""
+    if not TIKTOKEN_AVAILABLE:
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"[WARN] tiktoken encoding unavailable, estimating tokens from length: {e}")
+        return None
+
+
+def count_message_tokens(messages) -> int:
+    """Approximate token count of chat messages for the memory budget; never raises.
+
+    The LLM's own counter fails for Azure deployments without a model name and
+    for models langchain_openai has no formula for, so memory counts with
+    cl100k_base (about 4 characters per token without tiktoken).
+    """
+    encoding = _token_encoding()
+    total = 0
+    for message in messages:
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        if encoding is not None:
+            total += len(encoding.encode(content, disallowed_special=()))
+        else:
+            total += len(content) // 4 + 1
+        total += 4  # role and message framing
+    return total
+
+
 if LANGCHAIN_AVAILABLE:
     class MCPTool(BaseTool):
         """LangChain tool wrapper for MCP tools"""
@@ -41,7 +148,17 @@ if LANGCHAIN_AVAILABLE:
         description: str = Field(description="The description of the tool")
         session: ClientSession = Field(description="The MCP session", exclude=True)
         tool_schema: Dict[str, Any] = Field(description="The tool schema", exclude=True)
-        
+        futures: Optional[Dict[str, asyncio.Task]] = Field(
+            default=None,
+            description="When set, calls run in the background and return <future:id> placeholders",
+            exclude=True
+        )
+        loop: Optional[asyncio.AbstractEventLoop] = Field(
+            default=None,
+            description="Event loop that owns the MCP session",
+            exclude=True
+        )
+
         def __init__(self, name: str, description: str, session: ClientSession, schema: Dict[str, Any], **kwargs):
             super().__init__(
                 name=name,
@@ -54,36 +171,56 @@ if LANGCHAIN_AVAILABLE:
         async def _arun(self, *args, **kwargs) -> str:
             """Async implementation of the tool"""
             try:
-                # Handle LangChain input format
-                if len(args) == 1 and isinstance(args[0], str):
-                    # Check if it's a JSON string first
+                tool_args = self._prepare_args(args, kwargs)
+            except Exception as e:
+                return f"Error calling tool {self.name}: {str(e)}"
+
+            if self.futures is not None:
+                # Dispatch now and hand the model a placeholder it can resolve later
+                future_id = uuid.uuid4().hex[:8]
+                self.futures[future_id] = asyncio.create_task(self._call(tool_args))
+                return f"<future:{future_id}>"
+            return await self._call(tool_args)
+
+        def _prepare_args(self, args: tuple, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+            """Turn LangChain tool input into MCP tool arguments"""
+            # Handle LangChain input format
+            if len(args) == 1 and isinstance(args[0], str):
+                # Check if it's a JSON object/array first; plain strings skip the parse attempt
+                tool_args = None
+                if args[0].lstrip()[:1] in ("{", "["):
                     try:
-                        tool_args = json.loads(args[0])
-                        print(f"[DEBUG] Parsed LangChain JSON input: {tool_args}")
-                    except json.JSONDecodeError:
-                        # If it's not JSON, it might be a direct string argument for specific tools
-                        if self.name == "get_entity":
-                            # For get_entity, the string should be treated as the URN
-                            tool_args = {"urn": args[0]}
-                        else:
-                            # For other tools, treat as query
-                            tool_args = {"query": args[0]}
-                        print(f"[DEBUG] Created tool args from string: {tool_args}")
-                else:
-                    # Traditional kwargs handling
-                    tool_args = kwargs.copy()
-                    if args:
-                        # If positional args are provided, add them to kwargs
-                        tool_args.update({f"arg_{i}": arg for i, arg in enumerate(args)})
-                
-                # Fix filters parameter - convert dict to JSON string if needed
-                if 'filters' in tool_args and isinstance(tool_args['filters'], dict):
-                    tool_args['filters'] = json.dumps(tool_args['filters'])
-                    print(f"[DEBUG] Converted filters to JSON: {tool_args['filters']}")
-                
-                # Add debug logging for tool calls
-                print(f"[DEBUG] Calling tool {self.name} with final args: {tool_args}")
-                
+                        tool_args = orjson.loads(args[0])
+                        logger.debug("Parsed LangChain JSON input: %s", tool_args)
+                    except orjson.JSONDecodeError:
+                        pass
+                if tool_args is None:
+                    # If it's not JSON, it might be a direct string argument for specific tools
+                    if self.name == "get_entity":
+                        # For get_entity, the string should be treated as the URN
+                        tool_args = {"urn": args[0]}
+                    else:
+                        # For other tools, treat as query
+                        tool_args = {"query": args[0]}
+                    logger.debug("Created tool args from string: %s", tool_args)
+            else:
+                # Traditional kwargs handling; **kwargs is already a fresh dict owned by this call
+                tool_args = kwargs
+                if args:
+                    # If positional args are provided, add them to kwargs
+                    tool_args.update({f"arg_{i}": arg for i, arg in enumerate(args)})
+
+            # Fix filters parameter - convert dict to JSON string if needed
+            if 'filters' in tool_args and isinstance(tool_args['filters'], dict):
+                tool_args['filters'] = orjson.dumps(tool_args['filters']).decode()
+                logger.debug("Converted filters to JSON: %s", tool_args['filters'])
+            return tool_args
+
+        async def _call(self, tool_args: Dict[str, Any]) -> str:
+            """Call the MCP tool and return its first content item as text"""
+            try:
+                logger.debug("Calling tool %s with final args: %s", self.name, tool_args)
+
                 result = await self.session.call_tool(self.name, tool_args)
                 if result.content:
                     # Handle different content types from MCP - use type ignore for flexibility
@@ -97,17 +234,136 @@ if LANGCHAIN_AVAILABLE:
                 return "Tool executed successfully but returned no content"
             except Exception as e:
                 return f"Error calling tool {self.name}: {str(e)}"
-        
+
         def _run(self, *args, **kwargs) -> str:
             """Sync implementation (fallback)"""
-            # For sync calls, we need to run the async version
-            import asyncio
-            try:
-                loop = asyncio.get_event_loop()
-                return loop.run_until_complete(self._arun(*args, **kwargs))
-            except RuntimeError:
-                # If no event loop is running, create a new one
-                return asyncio.run(self._arun(*args, **kwargs))
+            return run_coroutine_sync(self._arun(*args, **kwargs), self.loop)
+
+    class BatchTool(BaseTool):
+        """Meta-tool that runs several independent MCP tool invocations concurrently"""
+
+        name: str = "batch"
+        description: str = (
+            "Run several independent tool calls at once and get all results in one step. "
+            "When you need several results that do not depend on each other, use this "
+            "instead of one action per tool. "
+            'Input: JSON like {"invocations": [{"tool_name": "<tool>", "arguments": {...}}, ...]}. '
+            "Returns a JSON list of results in the same order. Only batch calls that do not "
+            "depend on each other's results."
+        )
+        tool_map: Dict[str, MCPTool] = Field(default_factory=dict, exclude=True)
+        loop: Optional[asyncio.AbstractEventLoop] = Field(default=None, exclude=True)
+
+        async def _invoke(self, invocation: Any) -> str:
+            if not isinstance(invocation, dict):
+                return f"Error: invalid invocation {invocation!r}"
+            tool = self.tool_map.get(invocation.get("tool_name"))
+            if tool is None:
+                return f"Error: unknown tool {invocation.get('tool_name')!r}"
+            arguments = invocation.get("arguments") or {}
+            if not isinstance(arguments, dict):
+                return f"Error: arguments for {tool.name} must be a JSON object"
+            return await tool._call(tool._prepare_args((), arguments))
+
+        async def _arun(self, *args, **kwargs) -> str:
+            """Async implementation of the tool"""
+            payload = args[0] if len(args) == 1 else kwargs
+            if isinstance(payload, str):
+                try:
+                    payload = json.loads(payload)
+                except json.JSONDecodeError as e:
+                    return f"Error: batch input must be JSON: {e}"
+            invocations = payload.get("invocations") if isinstance(payload, dict) else payload
+            if not isinstance(invocations, list):
+                return 'Error: batch input must contain an "invocations" list'
+
+            results = await asyncio.gather(
+                *(self._invoke(invocation) for invocation in invocations),
+                return_exceptions=True
+            )
+            return json.dumps([
+                {
+                    "tool_name": invocation.get("tool_name") if isinstance(invocation, dict) else None,
+                    "result": f"Error: {result}" if isinstance(result, BaseException) else result
+                }
+                for invocation, result in zip(invocations, results)
+            ])
+
+        def _run(self, *args, **kwargs) -> str:
+            """Sync implementation (fallback)"""
+            return run_coroutine_sync(self._arun(*args, **kwargs), self.loop)
+
+    class ResolveFutureTool(BaseTool):
+        """Awaits background tool calls started by MCPTool in futures mode"""
+
+        name: str = "resolve_future"
+        description: str = (
+            "Tool calls return a <future:ID> placeholder immediately while they run in the background. "
+            "Keep reasoning or start other calls, and when you need the actual value pass the "
+            "placeholder(s) to this tool, e.g. '<future:1a2b3c4d> <future:5e6f7a8b>'."
+        )
+        futures: Dict[str, asyncio.Task] = Field(default_factory=dict, exclude=True)
+        loop: Optional[asyncio.AbstractEventLoop] = Field(default=None, exclude=True)
+
+        async def _arun(self, *args, **kwargs) -> str:
+            """Async implementation of the tool"""
+            text = " ".join(str(arg) for arg in (*args, *kwargs.values()))
+            future_ids = FUTURE_PATTERN.findall(text) or text.split()
+            if not future_ids:
+                return "Error: no <future:ID> placeholder given"
+
+            resolved = []
+            for future_id in future_ids:
+                task = self.futures.get(future_id)
+                if task is None:
+                    resolved.append(f"<future:{future_id}>: Error: unknown future")
+                else:
+                    resolved.append(f"<future:{future_id}>: {await task}")
+            return "\n".join(resolved)
+
+        def _run(self, *args, **kwargs) -> str:
+            """Sync implementation (fallback)"""
+            return run_coroutine_sync(self._arun(*args, **kwargs), self.loop)
+
+    class PercentEvictMemory(ConversationTokenBufferMemory):
+        """Token buffer memory that evicts a fraction of the budget at once.
+
+        The stock memory pops one message per save once over the limit, so a
+        long conversation sits just above the threshold and prunes (and shifts
+        the prompt prefix) on every turn. This drops the oldest Human/AI
+        exchanges until the buffer is ``evict_ratio`` below the limit, so
+        evictions are rare.
+        """
+
+        evict_ratio: float = 0.25
+
+        def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+            # Skip ConversationTokenBufferMemory's own one-by-one pruning
+            super(ConversationTokenBufferMemory, self).save_context(inputs, outputs)
+            self._prune()
+
+        async def asave_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+            # AgentExecutor.ainvoke saves through here; the base version appends without pruning
+            await super(ConversationTokenBufferMemory, self).asave_context(inputs, outputs)
+            self._prune()
+
+        def _prune(self) -> None:
+            buffer = self.chat_memory.messages
+            total = count_message_tokens(buffer)
+            if total <= self.max_token_limit:
+                return
+
+            target = int(self.max_token_limit * (1 - self.evict_ratio))
+            # The exchange just saved always survives, however long it is
+            keep_from = max(len(buffer) - 2, 0)
+            evict = 0
+            while evict < keep_from and total > target:
+                total -= count_message_tokens([buffer[evict]])
+                evict += 1
+            # Evict whole exchanges so the history never opens with an orphaned AI reply
+            while evict < keep_from and buffer[evict].type != "human":
+                evict += 1
+            del buffer[:evict]
 else:
     class MCPTool:
         """Placeholder when LangChain is not available"""
@@ -118,6 +374,107 @@ else:
             self.tool_schema = schema
 
 
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+MCP_HTTP_LIMITS = httpx.Limits(
+    max_keepalive_connections=int(os.getenv("MCP_HTTP_MAX_KEEPALIVE", "32")),
+    max_connections=int(os.getenv("MCP_HTTP_MAX_CONNECTIONS", "64"))
+)
+
+
+def mcp_http_client(headers: Optional[Dict[str, str]] = None,
+                    timeout: Optional[httpx.Timeout] = None,
+                    auth: Optional[httpx.Auth] = None) -> httpx.AsyncClient:
+    """httpx client factory for sse_client: HTTP/2 when available and a larger keep-alive pool.
+
+    Tool calls are POSTed on the same client as the SSE stream, so with the
+    default HTTP/1.1 settings concurrent calls queue behind each other.
+    """
+    return httpx.AsyncClient(
+        http2=HTTP2_AVAILABLE,
+        limits=MCP_HTTP_LIMITS,
+        timeout=timeout or httpx.Timeout(30.0, connect=5.0, read=300.0),
+        headers=headers,
+        auth=auth,
+        follow_redirects=True
+    )
+
+
+class MCPSessionPool:
+    """Process-wide pool of initialized MCP sessions, one per server URL.
+
+    Reconnecting to a pooled URL skips the SSE connect and the MCP initialize
+    handshake. Every acquire pings the pooled session first and replaces it
+    if the ping fails or gets no answer within ``ping_timeout`` seconds, since
+    an SSE stream can drop at any time and a ping is far cheaper than a
+    reconnect.
+    """
+
+    def __init__(self, ping_timeout: float = 5.0):
+        self.ping_timeout = ping_timeout
+        self._sessions: Dict[str, Tuple[AsyncExitStack, ClientSession]] = {}
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, server_url: str) -> ClientSession:
+        """Return a live session for server_url, connecting on first use"""
+        async with self._lock:
+            entry = self._sessions.get(server_url)
+            if entry is not None:
+                _, session = entry
+                try:
+                    await asyncio.wait_for(session.send_ping(), self.ping_timeout)
+                    return session
+                except Exception as e:
+                    print(f"[WARN] Pooled MCP session for {server_url} is unresponsive, reconnecting: {e!r}")
+                    await self._close(server_url)
+
+            stack = AsyncExitStack()
+            try:
+                streams = await stack.enter_async_context(sse_client(url=server_url, httpx_client_factory=mcp_http_client))
+                session = await stack.enter_async_context(ClientSession(*streams))
+                await session.initialize()
+            except BaseException:
+                await stack.aclose()
+                raise
+            self._sessions[server_url] = (stack, session)
+            print(f"[INFO] Opened MCP connection to {server_url}")
+            return session
+
+    async def _close(self, server_url: str):
+        stack, _ = self._sessions.pop(server_url)
+        try:
+            await stack.aclose()
+        except Exception as e:
+            print(f"[WARN] Error closing MCP connection to {server_url}: {e}")
+
+    async def close_all(self):
+        """Close every pooled session"""
+        async with self._lock:
+            for server_url in list(self._sessions):
+                await self._close(server_url)
+        print("[INFO] Closed MCP connection")
+
+
+MCP_SESSION_POOL = MCPSessionPool(ping_timeout=float(os.getenv("MCP_PING_TIMEOUT", "5")))
+
+# LangChain tools built per server URL, stored with a hash of the tool schemas they came from
+_TOOLS_CACHE: Dict[str, Tuple[str, List[MCPTool]]] = {}
+
+
+def _tool_schema_hash(mcp_tools) -> str:
+    """Fingerprint a list_tools() result so cached LangChain tools can be validated"""
+    payload = json.dumps(
+        [(tool.name, tool.description, tool.inputSchema) for tool in mcp_tools],
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
 class LangChainReActAgent:
     """Advanced autonomous agent using LangChain's ReAct pattern with MCP tools"""
     
@@ -128,11 +485,19 @@ class LangChainReActAgent:
         self.mcp_session: Optional[ClientSession] = None
         self.tools: List[MCPTool] = []
         self.agent_executor: Optional[AgentExecutor] = None
-        
+        # Background tool calls (AGENT_ASYNC_TOOLS=true) return <future:id> placeholders kept here
+        self.async_tool_calls = os.getenv("AGENT_ASYNC_TOOLS", "false").lower() == "true"
+        self._futures: Dict[str, asyncio.Task] = {}
+        self._active_queries = 0
+        self._prompt: Optional[PromptTemplate] = None
+        # (server URL, schema hash, session) the current tools and agent_executor were built for
+        self._tools_key: Optional[Tuple[str, str, ClientSession]] = None
+
         # Initialize LLM
         if llm_provider == "azure":
             self.llm = AzureChatOpenAI(
                 azure_deployment=os.getenv("MODEL", "gpt-35-turbo"),
+                model=os.getenv("MODEL", "gpt-35-turbo"),
                 api_version=os.getenv("AZURE_API_VERSION", "2023-05-15"),
                 azure_endpoint=os.getenv("AZURE_ENDPOINT", ""),
                 api_key=os.getenv("LLM_API_KEY", ""),  # type: ignore
@@ -148,36 +513,31 @@ class LangChainReActAgent:
             )
             print("[INFO] Using OpenAI for LangChain ReAct agent")
         
-        # Initialize memory for conversation history (suppress deprecation warning)
+        # Initialize token-budgeted memory for conversation history (suppress deprecation warning)
         import warnings
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
-            self.memory = ConversationBufferWindowMemory(
+            self.memory = PercentEvictMemory(
+                llm=self.llm,
                 memory_key="chat_history",
-                return_messages=True,
-                k=10  # Keep last 10 conversation turns
+                return_messages=False,  # rendered as role-tagged text into the string prompt
+                max_token_limit=int(os.getenv("AGENT_MEMORY_TOKEN_LIMIT", "2048")),
+                evict_ratio=float(os.getenv("AGENT_MEMORY_EVICT_RATIO", "0.25"))
             )
     
     @asynccontextmanager
     async def mcp_connection(self, server_url: str):
-        """Context manager for MCP connection"""
-        streams_context = sse_client(url=server_url)
-        streams = await streams_context.__aenter__()
-        session_context = ClientSession(*streams)
-        session = await session_context.__aenter__()
-        await session.initialize()
-        
+        """Context manager for MCP connection, backed by the shared session pool"""
+        session = await MCP_SESSION_POOL.acquire(server_url)
         try:
             self.mcp_session = session
-            await self._load_mcp_tools()
+            await self._load_mcp_tools(server_url)
             yield session
         finally:
-            await session_context.__aexit__(None, None, None)
-            await streams_context.__aexit__(None, None, None)
-            print("[INFO] Closed MCP connection")
+            self.mcp_session = None
     
-    async def _load_mcp_tools(self):
-        """Load MCP tools and convert them to LangChain tools"""
+    async def _load_mcp_tools(self, server_url: str):
+        """Load MCP tools and convert them to LangChain tools, reusing cached ones for unchanged schemas"""
         if not self.mcp_session:
             print("[WARN] No MCP session available")
             return
@@ -190,58 +550,75 @@ class LangChainReActAgent:
                 print("[WARN] No MCP tools available")
                 return
             
-            self.tools = []
-            for tool in mcp_tools.tools:
-                try:
-                    mcp_tool = MCPTool(
-                        name=tool.name,
-                        description=tool.description or "No description available",
-                        session=self.mcp_session,
-                        schema=tool.inputSchema
-                    )
-                    self.tools.append(mcp_tool)
-                    print(f"[DEBUG] Created tool: {tool.name}")
-                except Exception as e:
-                    print(f"[ERROR] Failed to create tool {tool.name}: {e}")
-                    continue
-            
+            schema_hash = _tool_schema_hash(mcp_tools.tools)
+            tools_key = (server_url, schema_hash, self.mcp_session)
+            if tools_key == self._tools_key and self.tools:
+                print("[INFO] MCP tools unchanged, keeping the current agent")
+                return
+
+            cached = _TOOLS_CACHE.get(server_url)
+            if cached and cached[0] == schema_hash:
+                cached_tools = cached[1]
+                print("[INFO] Reusing cached MCP tools (schemas unchanged)")
+            else:
+                cached_tools = [
+                    mcp_tool for mcp_tool in (self._make_tool(tool) for tool in mcp_tools.tools)
+                    if mcp_tool is not None
+                ]
+                _TOOLS_CACHE[server_url] = (schema_hash, cached_tools)
+
+            # Cached tools are shared by every agent in the process, so bind per-agent copies
+            loop = asyncio.get_running_loop()
+            binding = {
+                "session": self.mcp_session,
+                "futures": self._futures if self.async_tool_calls else None,
+                "loop": loop
+            }
+            self.tools = [mcp_tool.model_copy(update=binding) for mcp_tool in cached_tools]
+
+            if len(self.tools) > 1:
+                self.tools.append(BatchTool(tool_map={tool.name: tool for tool in self.tools}, loop=loop))
+            if self.async_tool_calls:
+                # Validation would copy the dict; bind the one MCPTool calls write their tasks into
+                self.tools.append(ResolveFutureTool(loop=loop).model_copy(update={"futures": self._futures}))
+
+            # New tool objects (other server, session or schemas): rebuild the agent on the next query
+            self.agent_executor = None
+            self._tools_key = tools_key
+
             print(f"[INFO] Loaded {len(self.tools)} MCP tools: {[t.name for t in self.tools]}")
             
         except Exception as e:
             print(f"[ERROR] Failed to load MCP tools: {e}")
     
+    def _make_tool(self, tool) -> Optional[MCPTool]:
+        """Wrap one MCP tool definition as a LangChain tool, or return None if it is invalid"""
+        try:
+            mcp_tool = MCPTool(
+                name=tool.name,
+                description=tool.description or "No description available",
+                session=self.mcp_session,
+                schema=tool.inputSchema
+            )
+            logger.debug("Created tool: %s", tool.name)
+            return mcp_tool
+        except Exception as e:
+            print(f"[ERROR] Failed to create tool {tool.name}: {e}")
+            return None
+
     def _create_agent(self):
         """Create the ReAct agent with loaded tools"""
         if not self.tools:
             print("[WARN] No tools available for agent")
             return None
-        prompt = PromptTemplate.from_template("""
-Answer the following questions as best you can. You have access to the following tools:
-
-{tools}
-
-Use the following format:
-
-Question: the input question you must answer
-Thought: you should always think about what to do
-Action: the action to take, should be one of [{tool_names}]
-Action Input: the input to the action
-Observation: the result of the action
-... (this Thought/Action/Action Input/Observation can repeat N times)
-Thought: I now know the final answer
-Final Answer: the final answer to the original input question
-Use chat-history to keep context of the conversation.
-Begin!
-
-Question: {input}
-Thought: {agent_scratchpad}
-""")
+        if self._prompt is None:
+            self._prompt = PromptTemplate.from_template(REACT_PROMPT_TEMPLATE)
         
         # Create the ReAct agent
         agent = create_react_agent(
             llm=self.llm,
             tools=self.tools,
-            prompt=prompt
+            prompt=self._prompt
         )
         
         # Create agent executor with memory
@@ -249,7 +626,7 @@ Thought: {agent_scratchpad}
             agent=agent,
             tools=self.tools,
             memory=self.memory,
-            verbose=True,
+            verbose=False,  # query() streams the reasoning trace itself
             max_iterations=10,
             max_execution_time=60,
             handle_parsing_errors=True,
@@ -259,7 +636,7 @@ Thought: {agent_scratchpad}
         print("[INFO] ReAct agent created successfully")
         return self.agent_executor
 
-    async def query(self, user_input: list) -> str:
+    async def query(self, user_input: str, stream: bool = True) -> str:
         """Process user query using the autonomous ReAct agent"""
         if not self.agent_executor:
             self._create_agent()
@@ -267,24 +644,35 @@ Thought: {agent_scratchpad}
         if not self.agent_executor:
             return "Error: Failed to create agent"
         
+        self._active_queries += 1
         try:
             print(f"\n[AGENT] Processing: {user_input}")
             print("[AGENT] Starting autonomous reasoning and action cycle...\n")
             
-            # Run the agent
-            
-            result = await self.agent_executor.ainvoke({
-                "input": user_input,
-            })
-            
+            if stream:
+                # Run the agent, streaming model tokens as they are generated
+                result = {}
+                async for event in self.agent_executor.astream_events({"input": user_input}, version="v2"):
+                    kind = event["event"]
+                    if kind == "on_chat_model_stream":
+                        sys.stdout.write(str(event["data"]["chunk"].content))
+                        sys.stdout.flush()
+                    elif kind == "on_tool_end":
+                        print(f"\nObservation: {str(event['data'].get('output'))[:200]}\n")
+                    elif kind == "on_chain_end" and not event["parent_ids"]:
+                        result = event["data"]["output"]
+                print()
+            else:
+                result = await self.agent_executor.ainvoke({"input": user_input})
+
             # Extract the final answer
             final_answer = result.get("output", "No output received")
             
             # Show intermediate steps if available
-            if "intermediate_steps" in result:
-                print("\n[DEBUG] Agent reasoning steps:")
+            if "intermediate_steps" in result and logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Agent reasoning steps:")
                 for i, (action, observation) in enumerate(result["intermediate_steps"], 1):
-                    print(f"  Step {i}: {action.tool} -> {observation[:100]}...")
+                    logger.debug("  Step %d: %s -> %s...", i, action.tool, str(observation)[:100])
             
             return final_answer
             
@@ -292,7 +680,28 @@ Thought: {agent_scratchpad}
             error_msg = f"Error processing query: {str(e)}"
             print(f"[ERROR] {error_msg}")
             return error_msg
-    
+        finally:
+            self._active_queries -= 1
+            if not self._active_queries:
+                # Futures the model never resolved are not needed once no query is running
+                for task in self._futures.values():
+                    task.cancel()
+                self._futures.clear()
+
+    async def run_batch(self, prompts: List[str], max_concurrency: int = 10) -> List[str]:
+        """Answer several independent prompts concurrently, at most max_concurrency at a time.
+
+        Answers are returned in prompt order. All runs share the agent's memory, so
+        use this for independent questions (e.g. evaluation sets), not a dialogue.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def bounded_query(prompt: str) -> str:
+            async with semaphore:
+                return await self.query(prompt, stream=False)
+
+        return list(await asyncio.gather(*(bounded_query(prompt) for prompt in prompts)))
+
     def clear_memory(self):
         """Clear the agent's conversation memory"""
         self.memory.clear()
@@ -325,12 +734,24 @@ async def main(mcp_url: str = "http://10.241.89.113:3002/sse"):
         print("\nAlternatively, use the original MCP agent with: python main.py")
         return
     
+    setup_logging()
+    if os.getenv("MCP_DEBUG", "false").lower() == "true":
+        logger.setLevel(logging.DEBUG)
+
     try:
         agent = LangChainReActAgent()
     except ImportError as e:
         print(f"❌ Error initializing agent: {e}")
         return
 
+    try:
+        await chat_loop(agent, mcp_url)
+    finally:
+        await MCP_SESSION_POOL.close_all()
+
+
+async def chat_loop(agent: "LangChainReActAgent", mcp_url: str):
+    """Read user queries until exit and answer them with the agent"""
     async with agent.mcp_connection(mcp_url):
         print("\n🤖 LangChain ReAct Agent Connected! with MCP URL:", mcp_url)
         print(f"🔧 Available tools: {[tool.name for tool in agent.tools]}")
@@ -338,7 +759,7 @@ async def main(mcp_url: str = "http://10.241.89.113:3002/sse"):
         print("Commands: 'exit', 'clear' (memory), 'memory' (show history)\n")
         
         while True:
-            user_input = input("👉 You: ").strip()
+            user_input = (await ainput("👉 You: ")).strip()
             
             if user_input.lower() in ['exit', 'quit']:
                 print("🚀 Exiting...")
@@ -355,9 +776,8 @@ async def main(mcp_url: str = "http://10.241.89.113:3002/sse"):
             if not user_input:
                 continue
             print(f"\n🧠 Processing your query: {user_input} and memory:{agent.memory.chat_memory.messages}")
-            query = "previous conversation: " + agent.get_memory_summary() + " current question: " + user_input
-            # Let the agent process the query autonomously
-            response = await agent.query(query)
+            # Let the agent process the query autonomously; memory fills {chat_history}
+            response = await agent.query(user_input)
             print(f"\n🤖 Agent: {response}\n")
 
 
@@ -0,0 +1,39 @@
+"""
+Shared logging setup for the agent entry points
+"""
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+LOG_FORMAT = "[%(levelname)s] %(message)s"
+
+# Libraries that log every HTTP request at INFO
+QUIET_LOGGERS = ("httpx", "httpcore")
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging(level: Optional[int] = None):
+    """Attach a console handler to the root logger once, optionally setting its level.
+
+    Records are handed to a queue and written by a background listener thread,
+    so logging calls never block the event loop on console I/O.
+    """
+    global _listener
+    root = logging.getLogger()
+    if _listener is None and not root.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        log_queue = queue.SimpleQueue()
+        _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+        root.addHandler(QueueHandler(log_queue))
+        for name in QUIET_LOGGERS:
+            library_logger = logging.getLogger(name)
+            if library_logger.level == logging.NOTSET:
+                library_logger.setLevel(logging.WARNING)
+    if level is not None:
+        root.setLevel(level)
@@ -1,33 +1,49 @@
 import asyncio
-import json
+import orjson
 import os
 from datetime import datetime
+from aioconsole import ainput
 from mcp_client_agent import MCPClient
 from dotenv import load_dotenv
 load_dotenv()
 mcp_url = os.getenv("MCP_URL", "http://localhost:8000")
 
-def save_chat_history(chat_history, filename="chat_history.json"):
-    """Save chat history to a JSON file"""
+def save_chat_history(chat_history, saved_count=0, filename="chat_history.jsonl"):
+    """Append turns not yet saved to a JSONL file and return how many turns are now saved.
+
+    A saved_count of 0 rewrites the file, e.g. after the history was cleared.
+    """
     try:
-        history_data = {
-            "timestamp": datetime.now().isoformat(),
-            "conversations": chat_history
-        }
-        with open(filename, 'w') as f:
-            json.dump(history_data, f, indent=2)
+        with open(filename, 'ab' if saved_count else 'wb') as f:
+            for user_msg, agent_msg in chat_history[saved_count:]:
+                f.write(orjson.dumps({"ts": datetime.now().isoformat(), "user": user_msg, "agent": agent_msg}))
+                f.write(b"\n")
         print(f"💾 Chat history saved to {filename}")
+        return len(chat_history)
     except Exception as e:
         print(f"❌ Error saving chat history: {e}")
+        return saved_count
+
+def load_chat_history(filename="chat_history.jsonl", legacy_filename="chat_history.json"):
+    """Load chat history from a JSONL file.
 
-def load_chat_history(filename="chat_history.json"):
-    """Load chat history from a JSON file"""
+    If only a history saved in the older single-JSON format exists, it is converted to JSONL once.
+    """
     try:
         if os.path.exists(filename):
-            with open(filename, 'r') as f:
-                history_data = json.load(f)
-            print(f"📂 Loaded chat history from {filename} (saved: {history_data.get('timestamp', 'unknown')})")
-            return history_data.get('conversations', [])
+            with open(filename, 'rb') as f:
+                entries = [orjson.loads(line) for line in f if line.strip()]
+            print(f"📂 Loaded chat history from {filename}")
+            return [(entry["user"], entry["agent"]) for entry in entries]
+        if os.path.exists(legacy_filename):
+            with open(legacy_filename, 'rb') as f:
+                history_data = orjson.loads(f.read())
+            chat_history = [tuple(turn) for turn in history_data.get('conversations', [])]
+            print(f"📂 Loaded chat history from {legacy_filename} (saved: {history_data.get('timestamp', 'unknown')})")
+            # Written in full now, so later saves only append
+            if len(chat_history) != save_chat_history(chat_history, 0, filename):
+                print(f"[WARN] Could not convert {legacy_filename}; its history will not be kept after this session")
+            return chat_history
         return []
     except Exception as e:
         print(f"❌ Error loading chat history: {e}")
@@ -46,6 +62,14 @@ async def interactive_chat():
 
         # Initialize conversation history
         chat_history = load_chat_history()
+        saved_count = len(chat_history)
+
+        # Seed the client's conversation once; process_user_query appends each new turn
+        client.messages = [
+            message
+            for prev_user, prev_agent in chat_history
+            for message in ({"role": "user", "content": prev_user}, {"role": "assistant", "content": prev_agent})
+        ]
 
         print("\n🤖 Connected to MCP Agent!")
         print(f"📋 Available tools: {len(available_tools)}")
@@ -57,7 +81,7 @@ async def interactive_chat():
         print("Type 'exit' to quit, 'clear' to clear history, 'save' to save history, or 'history' to view chat history.\n")
 
         while True:
-            user_query = input("👉 You: ").strip()
+            user_query = (await ainput("👉 You: ")).strip()
 
             if user_query.lower() in ['exit', 'quit']:
                 print("🚀 Exiting chat...")
@@ -65,12 +89,13 @@ async def interactive_chat():
             
             if user_query.lower() == 'clear':
                 chat_history = []
+                saved_count = 0
                 client.messages = []  # Clear the client's message history too
                 print("🗑️ Chat history cleared!\n")
                 continue
                 
             if user_query.lower() == 'save':
-                save_chat_history(chat_history)
+                saved_count = save_chat_history(chat_history, saved_count)
                 continue
                 
             if user_query.lower() == 'history':
@@ -84,14 +109,6 @@ async def interactive_chat():
                 print()
                 continue
 
-            # Set the chat history in the client before processing
-            if chat_history:
-                # Build the full conversation history
-                client.messages = []
-                for prev_user, prev_agent in chat_history:
-                    client.messages.append({"role": "user", "content": prev_user})
-                    client.messages.append({"role": "assistant", "content": prev_agent})
-
             response = await client.process_user_query(
                 available_tools=available_tools,
                 user_query=user_query,
@@ -105,7 +122,7 @@ async def interactive_chat():
 
     # Auto-save chat history on exit
     if chat_history:
-        save_chat_history(chat_history)
+        save_chat_history(chat_history, saved_count)
 
     await client.close()
     print("[INFO] Client closed cleanly.")
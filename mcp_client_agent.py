@@ -1,24 +1,39 @@
 import asyncio
+import functools
 import json
+import logging
 import os
-from typing import Any, Dict, List, Union, Optional
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
 from contextlib import AsyncExitStack, asynccontextmanager
 from mcp import StdioServerParameters, ClientSession
 from mcp.client.stdio import stdio_client
 from mcp.client.sse import sse_client
 from openai import AzureOpenAI, OpenAI
 from dotenv import load_dotenv
-import traceback
+from log_utils import setup_logging
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Interpreter used to launch a STDIO MCP server, keyed by script extension
+STDIO_SERVER_COMMANDS = {".py": "python", ".js": "node"}
+
 
 class MCPClient:
     def __init__(self, llm_provider: str = "azure"):
         self.exit_stack = AsyncExitStack()
         self.session: ClientSession | None = None
-        self.messages: List[Dict[str, Any]] = []
+        self.max_history_messages = int(os.getenv("MAX_HISTORY_MESSAGES", "100"))
+        self.messages = []
+        self._tool_dispatch: Dict[str, Callable] = {}
+        self._tool_dispatch_source: Optional[Dict[str, Any]] = None
         self.debug = os.getenv("MCP_DEBUG", "false").lower() == "true"
+        if self.debug:
+            setup_logging()
+            logger.setLevel(logging.DEBUG)
+        self.max_tool_concurrency = max(1, int(os.getenv("MCP_MAX_TOOL_CONCURRENCY", "8")))
 
         # LLM Configuration with better defaults and validation
         self.model = os.getenv("MODEL", "gpt-4")
@@ -51,15 +66,30 @@ class MCPClient:
         else:
             raise ValueError(f"Unsupported LLM provider: {llm_provider}")
 
+    @property
+    def messages(self) -> Deque[Dict[str, Any]]:
+        """Conversation history, bounded to the last max_history_messages entries"""
+        return self._messages
+
+    @messages.setter
+    def messages(self, value: Iterable[Dict[str, Any]]):
+        self._messages = deque(value, maxlen=self.max_history_messages)
+
+    def ensure_system_prompt(self, system_prompt: str):
+        """Make sure the conversation starts with the given system prompt"""
+        if self.messages and self.messages[0].get("role") == "system":
+            return
+        if len(self.messages) == self.messages.maxlen:
+            self.messages.popleft()
+        self.messages.appendleft({"role": "system", "content": system_prompt})
+
     async def connect_to_stdio_server(self, server_script_path: str):
         """Connect to MCP server using STDIO"""
-        is_python = server_script_path.endswith('.py')
-        is_js = server_script_path.endswith('.js')
-
-        if not (is_python or is_js):
-            raise ValueError("Server script must be .py or .js")
+        ext = os.path.splitext(server_script_path)[1]
+        command = STDIO_SERVER_COMMANDS.get(ext)
+        if command is None:
+            raise ValueError(f"Server script must be one of: {', '.join(STDIO_SERVER_COMMANDS)}")
 
-        command = "python" if is_python else "node"
         server_params = StdioServerParameters(
             command=command,
             args=[server_script_path],
@@ -88,9 +118,8 @@ class MCPClient:
         session = None
         
         try:
-            if self.debug:
-                print(f"[DEBUG] Connecting to SSE server at {server_url}")
-                
+            logger.debug("Connecting to SSE server at %s", server_url)
+
             streams_context = sse_client(url=server_url)
             streams = await streams_context.__aenter__()
             
@@ -98,15 +127,13 @@ class MCPClient:
             session = await session_context.__aenter__()
             await session.initialize()
             
-            if self.debug:
-                print(f"[DEBUG] SSE client initialized successfully")
-                
+            logger.debug("SSE client initialized successfully")
+
             yield session
             
         except Exception as e:
             print(f"[ERROR] SSE client error: {e}")
-            if self.debug:
-                print(f"[DEBUG] SSE error traceback: {traceback.format_exc()}")
+            logger.debug("SSE error traceback", exc_info=True)
             raise
         finally:
             # Cleanup in reverse order with error handling
@@ -156,9 +183,8 @@ class MCPClient:
                     }
                     tools.append(tool_def)
                     
-                    if self.debug:
-                        print(f"[DEBUG] Added tool: {tool.name}")
-                        
+                    logger.debug("Added tool: %s", tool.name)
+
                 except Exception as e:
                     print(f"[WARNING] Failed to process tool {getattr(tool, 'name', 'unknown')}: {e}")
                     continue
@@ -168,8 +194,7 @@ class MCPClient:
             
         except Exception as e:
             print(f"[ERROR] Failed to list tools: {e}")
-            if self.debug:
-                print(f"[DEBUG] List tools traceback: {traceback.format_exc()}")
+            logger.debug("List tools traceback", exc_info=True)
             return []
 
     async def process_user_query(
@@ -196,18 +221,23 @@ class MCPClient:
             response = await self._call_llm(available_tools)
             azure_response = response.choices[0].message
             assistant_content = azure_response.content or ""
-            
+
+            # Fast path: plain answer without tool calls
+            if not azure_response.tool_calls:
+                self.messages.append({"role": "assistant", "content": assistant_content})
+                return assistant_content
+
             # Handle tool calls with iteration limit
             while azure_response.tool_calls and iteration_count < max_iterations:
                 iteration_count += 1
-                
-                if self.debug:
-                    print(f"[DEBUG] Tool call iteration {iteration_count}")
-                
+
+                logger.debug("Tool call iteration %d", iteration_count)
+
                 # Add assistant response with tool_calls to conversation
-                assistant_message: Dict[str, Any] = {"role": "assistant", "content": assistant_content}
-                if azure_response.tool_calls:
-                    assistant_message["tool_calls"] = [
+                self.messages.append({
+                    "role": "assistant",
+                    "content": assistant_content,
+                    "tool_calls": [
                         {
                             "id": tool_call.id,
                             "type": "function",
@@ -218,13 +248,12 @@ class MCPClient:
                         }
                         for tool_call in azure_response.tool_calls
                     ]
-                self.messages.append(assistant_message)
+                })
                 print(f"[INFO] Processing {len(azure_response.tool_calls)} tool calls (iteration {iteration_count})")
                 
-                # Execute tool calls
-                for tool_call in azure_response.tool_calls:
-                    tool_result = await self._execute_tool_call(tool_call, tool_session_map)
-                    self.messages.append(tool_result)
+                # Execute tool calls concurrently; results keep the tool_calls order
+                tool_results = await self._execute_tool_calls(azure_response.tool_calls, tool_session_map)
+                self.messages.extend(tool_results)
                 
                 # Get follow-up response from LLM with tool results
                 response = await self._call_llm(available_tools)
@@ -245,16 +274,19 @@ class MCPClient:
         except Exception as e:
             error_msg = f"Error processing query: {str(e)}"
             print(f"[ERROR] {error_msg}")
-            if self.debug:
-                print(f"[DEBUG] Process query traceback: {traceback.format_exc()}")
+            logger.debug("Process query traceback", exc_info=True)
             return error_msg
 
     async def _call_llm(self, available_tools: List[Dict[str, Any]]):
         """Make LLM API call with error handling"""
+        messages = list(self.messages)
+        # Tool results whose assistant tool_calls message was evicted are invalid
+        while messages and messages[0].get("role") == "tool":
+            messages.pop(0)
         try:
             return await asyncio.to_thread(
                 self.llm_client.chat.completions.create,
-                messages=self.messages,  # type: ignore
+                messages=messages,  # type: ignore
                 model=self.model,
                 tools=available_tools if available_tools else None,  # type: ignore
                 tool_choice="auto" if available_tools else "none",
@@ -265,7 +297,58 @@ class MCPClient:
             print(f"[ERROR] LLM API call failed: {e}")
             raise
 
-    async def _execute_tool_call(self, tool_call, tool_session_map: Dict[str, Any]) -> Dict[str, Any]:
+    @staticmethod
+    def _tool_call_key(tool_call) -> tuple:
+        """Identify a tool call by name and canonical arguments, ignoring key order"""
+        arguments = tool_call.function.arguments  # type: ignore
+        try:
+            arguments = json.dumps(json.loads(arguments), sort_keys=True)
+        except (TypeError, json.JSONDecodeError):
+            pass
+        return tool_call.function.name, arguments  # type: ignore
+
+    async def _execute_tool_calls(self, tool_calls, tool_session_map: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Execute all tool calls of one LLM turn concurrently, bounded by max_tool_concurrency.
+
+        Identical calls (same tool and arguments) run once and share the result.
+        """
+        unique_calls: Dict[tuple, Any] = {}
+        call_keys = []
+        for tool_call in tool_calls:
+            key = self._tool_call_key(tool_call)
+            unique_calls.setdefault(key, tool_call)
+            call_keys.append(key)
+
+        if len(unique_calls) < len(call_keys):
+            logger.debug("Coalesced %d duplicate tool calls", len(call_keys) - len(unique_calls))
+
+        tool_dispatch = self._get_tool_dispatch(tool_session_map)
+        semaphore = asyncio.Semaphore(self.max_tool_concurrency)
+
+        async def run(tool_call) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._execute_tool_call(tool_call, tool_dispatch)
+
+        results = dict(zip(
+            unique_calls,
+            await asyncio.gather(*(run(tool_call) for tool_call in unique_calls.values()))
+        ))
+        return [
+            {**results[key], "tool_call_id": tool_call.id}
+            for tool_call, key in zip(tool_calls, call_keys)
+        ]
+
+    def _get_tool_dispatch(self, tool_session_map: Dict[str, Any]) -> Dict[str, Callable]:
+        """Map each tool name to its bound call_tool, rebuilt only when a new session map is passed"""
+        if tool_session_map is not self._tool_dispatch_source:
+            self._tool_dispatch = {
+                tool_name: functools.partial(session.call_tool, tool_name)
+                for tool_name, session in tool_session_map.items()
+            }
+            self._tool_dispatch_source = tool_session_map
+        return self._tool_dispatch
+
+    async def _execute_tool_call(self, tool_call, tool_dispatch: Dict[str, Callable]) -> Dict[str, Any]:
         """Execute a single tool call with comprehensive error handling"""
         tool_name = tool_call.function.name  # type: ignore
         tool_call_id = tool_call.id
@@ -286,7 +369,8 @@ class MCPClient:
             print(f"[INFO] Calling tool: {tool_name} with args: {tool_args}")
             
             # Check if tool is available
-            if tool_name not in tool_session_map:
+            call_tool = tool_dispatch.get(tool_name)
+            if call_tool is None:
                 error_msg = f"Tool {tool_name} not available in session map"
                 print(f"[ERROR] {error_msg}")
                 return {
@@ -297,12 +381,11 @@ class MCPClient:
             
             # Execute the tool
             try:
-                result = await tool_session_map[tool_name].call_tool(tool_name, tool_args)
+                result = await call_tool(tool_args)
                 tool_content = result.content[0].text if result.content else "No output from tool"
                 
-                if self.debug:
-                    print(f"[DEBUG] Tool {tool_name} returned: {len(tool_content)} characters")
-                    
+                logger.debug("Tool %s returned: %d characters", tool_name, len(tool_content))
+
                 return {
                     "role": "tool",
                     "tool_call_id": tool_call_id,
@@ -312,8 +395,7 @@ class MCPClient:
             except Exception as e:
                 error_msg = f"Error calling tool {tool_name}: {str(e)}"
                 print(f"[ERROR] {error_msg}")
-                if self.debug:
-                    print(f"[DEBUG] Tool call traceback: {traceback.format_exc()}")
+                logger.debug("Tool call traceback", exc_info=True)
                     
                 return {
                     "role": "tool",
@@ -352,5 +434,4 @@ class MCPClient:
             print("[INFO] Cleaned up MCP client resources")
         except Exception as e:
             print(f"[ERROR] Error during cleanup: {e}")
-            if self.debug:
-                print(f"[DEBUG] Cleanup traceback: {traceback.format_exc()}")
+            logger.debug("Cleanup traceback", exc_info=True)
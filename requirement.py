@@ -3,15 +3,18 @@ uvicorn>=0.24.0
 jinja2>=3.1.2
 python-dotenv>=1.0.0
 openai>=1.0.0
-httpx>=0.25.0
-mcp>=1.0.0
+httpx[http2]>=0.25.0
+mcp>=1.9.0,<2
 anyio>=4.0.0
 redis>=5.0.0
 websockets>=12.0
 python-multipart>=0.0.6
+orjson>=3.9.0
+ormsgpack>=1.4.0
+aioconsole>=0.7.0
 
 # LangChain dependencies for ReAct agent
-langchain>=0.1.0
+langchain>=0.3.0
 langchain-openai>=0.1.0
 langchain-community>=0.1.0
 langchainhub>=0.1.0
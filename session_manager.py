@@ -1,12 +1,18 @@
 """
 Redis-based session management for chat threads
 """
-import json
+import threading
 import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional
+import logging
 import os
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
+from functools import lru_cache
+
+import orjson
+import ormsgpack
 
 try:
     import redis
@@ -14,6 +20,62 @@ try:
 except ImportError:
     REDIS_AVAILABLE = False
 
+logger = logging.getLogger(__name__)
+
+# Threads kept in each user's thread index
+MAX_USER_THREADS = 100
+# Thread keys expire after 30 days without a write
+THREAD_TTL = timedelta(days=30)
+
+# KEYS: thread meta, thread messages, user index hash, user order zset, legacy user thread list
+# ARGV: thread_id, title, updated_at, updated_at score, ttl seconds
+# Returns -1 without writing while the user's legacy list still needs migrating
+UPDATE_THREAD_TITLE_SCRIPT = """
+if redis.call('EXISTS', KEYS[5]) == 1 then
+    return -1
+end
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'title', ARGV[2], 'updated_at', ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+redis.call('EXPIRE', KEYS[2], ARGV[5])
+local info = redis.call('HGET', KEYS[3], ARGV[1])
+if info then
+    local entry = cjson.decode(info)
+    entry['title'] = ARGV[2]
+    entry['updated_at'] = ARGV[3]
+    redis.call('HSET', KEYS[3], ARGV[1], cjson.encode(entry))
+    redis.call('ZADD', KEYS[4], ARGV[4], ARGV[1])
+end
+return 1
+"""
+
+# KEYS: thread meta, thread messages
+# ARGV: ttl seconds, then field/value pairs to set
+UPDATE_THREAD_META_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+return 1
+"""
+
+
+@lru_cache(maxsize=None)
+def _get_connection_pool(redis_url: str) -> "redis.ConnectionPool":
+    """One bounded connection pool per Redis URL, shared by every client in the process.
+    
+    Replies are left as bytes since messages are stored as MessagePack.
+    """
+    return redis.ConnectionPool.from_url(
+        redis_url,
+        max_connections=int(os.getenv('REDIS_MAX_CONNECTIONS', '100'))
+    )
+
+
 @dataclass
 class ChatMessage:
     role: str
@@ -26,11 +88,24 @@ class ChatMessage:
             self.message_id = str(uuid.uuid4())
     
     def to_dict(self) -> Dict:
-        return asdict(self)
+        return {
+            "role": self.role,
+            "content": self.content,
+            "timestamp": self.timestamp,
+            "message_id": self.message_id
+        }
     
     @classmethod
     def from_dict(cls, data: Dict) -> 'ChatMessage':
         return cls(**data)
+    
+    def to_msgpack(self) -> bytes:
+        """Positional MessagePack array, so field names aren't repeated in every stored message"""
+        return ormsgpack.packb([self.role, self.content, self.timestamp, self.message_id])
+    
+    @classmethod
+    def from_msgpack(cls, data: bytes) -> 'ChatMessage':
+        return cls(*ormsgpack.unpackb(data))
 
 @dataclass
 class ChatThread:
@@ -47,13 +122,24 @@ class ChatThread:
             if isinstance(self.messages[0], dict):
                 self.messages = [ChatMessage.from_dict(msg) for msg in self.messages]
     
+    def meta_dict(self) -> Dict:
+        """Every field except messages"""
+        return {
+            "thread_id": self.thread_id,
+            "title": self.title,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "mcp_url": self.mcp_url,
+            "system_prompt": self.system_prompt
+        }
+    
     def to_dict(self) -> Dict:
-        data = asdict(self)
+        data = self.meta_dict()
         data['messages'] = [msg.to_dict() for msg in self.messages]
         return data
     
     def to_json(self) -> str:
-        return json.dumps(self.to_dict())
+        return orjson.dumps(self.to_dict()).decode()
     
     @classmethod
     def from_dict(cls, data: Dict) -> 'ChatThread':
@@ -64,34 +150,166 @@ class ChatThread:
     
     @classmethod
     def from_json(cls, json_str: str) -> 'ChatThread':
-        return cls.from_dict(json.loads(json_str))
+        return cls.from_dict(orjson.loads(json_str))
+
+class ThreadCache:
+    """Thread-safe LRU of ChatThread objects keyed by thread_id"""
+    
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self._threads: "OrderedDict[str, ChatThread]" = OrderedDict()
+        self._lock = threading.RLock()
+    
+    def get(self, thread_id: str) -> Optional[ChatThread]:
+        with self._lock:
+            thread = self._threads.get(thread_id)
+            if thread is not None:
+                self._threads.move_to_end(thread_id)
+            return thread
+    
+    def put(self, thread: ChatThread):
+        with self._lock:
+            self._threads[thread.thread_id] = thread
+            self._threads.move_to_end(thread.thread_id)
+            if len(self._threads) > self.maxsize:
+                self._threads.popitem(last=False)
+    
+    def pop(self, thread_id: str):
+        with self._lock:
+            self._threads.pop(thread_id, None)
 
 class RedisSessionManager:
     def __init__(self, redis_url: Optional[str] = None):
         if redis_url is None:
             redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379')
-        
+
+        # Used when Redis is unavailable or a Redis write fails
+        self._memory_store = {}
+        # Recently used threads, so mutations don't re-read and re-parse them from Redis
+        self._thread_cache = ThreadCache(int(os.getenv('THREAD_CACHE_SIZE', '512')))
+
         if REDIS_AVAILABLE:
             try:
-                self.redis_client = redis.from_url(redis_url, decode_responses=True)
+                self.redis_client = redis.Redis(connection_pool=_get_connection_pool(redis_url))
                 # Test connection
                 self.redis_client.ping()
-                print(f"[INFO] Connected to Redis at {redis_url}")
+                logger.info("Connected to Redis at %s", redis_url)
+                # Sent with EVALSHA, falling back to EVAL the first time a server hasn't seen them
+                self._update_title_script = self.redis_client.register_script(UPDATE_THREAD_TITLE_SCRIPT)
+                self._update_meta_script = self.redis_client.register_script(UPDATE_THREAD_META_SCRIPT)
             except Exception as e:
-                print(f"[WARN] Redis connection failed: {e}. Using in-memory storage.")
+                logger.warning("Redis connection failed: %s. Using in-memory storage.", e)
                 self.redis_client = None
-                self._memory_store = {}
         else:
-            print("[WARN] Redis not available. Using in-memory storage.")
+            logger.warning("Redis not available. Using in-memory storage.")
             self.redis_client = None
-            self._memory_store = {}
     
     def _get_thread_key(self, thread_id: str) -> str:
+        """Hash of thread metadata (every ChatThread field except messages)"""
+        return f"chat_thread:{thread_id}:meta"
+    
+    def _get_thread_messages_key(self, thread_id: str) -> str:
+        """List of MessagePack-encoded messages in conversation order"""
+        return f"chat_thread:{thread_id}:msgs"
+    
+    def _get_legacy_thread_key(self, thread_id: str) -> str:
+        """Whole thread as one JSON string, used before the meta hash + message list split"""
         return f"chat_thread:{thread_id}"
     
+    def _migrate_legacy_thread(self, thread_id: str) -> bool:
+        """Move a legacy single-string thread into the meta hash + message list.
+        
+        Returns True if legacy data was found, whether this call or a concurrent one converted it.
+        """
+        legacy_key = self._get_legacy_thread_key(thread_id)
+        try:
+            with self.redis_client.pipeline() as pipe:
+                pipe.watch(legacy_key)
+                thread_data = pipe.get(legacy_key)
+                if not thread_data:
+                    return False
+                thread = ChatThread.from_json(thread_data)
+                pipe.multi()
+                pipe.delete(self._get_thread_messages_key(thread_id))
+                pipe.hset(
+                    self._get_thread_key(thread_id),
+                    mapping={key: value for key, value in thread.meta_dict().items() if value is not None}
+                )
+                if thread.messages:
+                    pipe.rpush(self._get_thread_messages_key(thread_id), *(msg.to_msgpack() for msg in thread.messages))
+                self._expire_thread(pipe, thread_id)
+                pipe.delete(legacy_key)
+                pipe.execute()
+            logger.info("Migrated thread %s to the split layout", thread_id)
+        except redis.WatchError:
+            pass  # Converted by a concurrent request
+        return True
+    
+    def _read_thread(self, thread_id: str):
+        """Fetch a thread's meta hash and raw message list in one round-trip"""
+        with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.hgetall(self._get_thread_key(thread_id))
+            pipe.lrange(self._get_thread_messages_key(thread_id), 0, -1)
+            return pipe.execute()
+    
+    def _expire_thread(self, pipe, thread_id: str):
+        """Queue the TTL refresh for both keys of a thread"""
+        pipe.expire(self._get_thread_key(thread_id), THREAD_TTL)
+        pipe.expire(self._get_thread_messages_key(thread_id), THREAD_TTL)
+    
     def _get_user_threads_key(self, user_id: str = "default") -> str:
+        """Hash of thread_id -> thread summary JSON"""
+        return f"user_threads:{user_id}:meta"
+    
+    def _get_user_threads_order_key(self, user_id: str = "default") -> str:
+        """Sorted set of thread_ids scored by last update time"""
+        return f"user_threads:{user_id}:order"
+    
+    def _get_legacy_user_threads_key(self, user_id: str = "default") -> str:
+        """List of thread summary JSON used before the hash + sorted set index"""
         return f"user_threads:{user_id}"
     
+    def _migrate_legacy_user_threads(self, user_id: str) -> bool:
+        """Move a user's legacy thread list into the hash + sorted set index.
+        
+        Returns True if a legacy list was found, whether this call or a concurrent one converted it.
+        """
+        legacy_key = self._get_legacy_user_threads_key(user_id)
+        try:
+            with self.redis_client.pipeline() as pipe:
+                pipe.watch(legacy_key)
+                threads_data = pipe.lrange(legacy_key, 0, -1)
+                if not threads_data:
+                    return False
+                pipe.multi()
+                for thread_data in threads_data:
+                    self._index_thread(pipe, user_id, orjson.loads(thread_data))
+                pipe.delete(legacy_key)
+                pipe.zrange(self._get_user_threads_order_key(user_id), 0, -(MAX_USER_THREADS + 1))
+                results = pipe.execute()
+            self._trim_user_threads(user_id, results[-1])
+            logger.info("Migrated %d threads of user %s to the indexed layout", len(threads_data), user_id)
+        except redis.WatchError:
+            pass  # Converted by a concurrent request
+        return True
+    
+    def _index_thread(self, pipe, user_id: str, thread_info: Dict):
+        """Queue the HSET + ZADD that record a thread summary in the user's index"""
+        thread_id = thread_info["thread_id"]
+        pipe.hset(self._get_user_threads_key(user_id), thread_id, orjson.dumps(thread_info))
+        pipe.zadd(
+            self._get_user_threads_order_key(user_id),
+            {thread_id: datetime.fromisoformat(thread_info["updated_at"]).timestamp()}
+        )
+    
+    def _trim_user_threads(self, user_id: str, overflow: List[str]):
+        """Drop thread_ids that fell out of the newest MAX_USER_THREADS from the user's index"""
+        if overflow:
+            with self.redis_client.pipeline() as pipe:
+                pipe.zrem(self._get_user_threads_order_key(user_id), *overflow)
+                pipe.hdel(self._get_user_threads_key(user_id), *overflow)
+                pipe.execute()
+    
     def create_thread(self, title: Optional[str] = None, user_id: str = "default", 
                      mcp_url: Optional[str] = None, system_prompt: Optional[str] = None) -> str:
         """Create a new chat thread"""
@@ -111,48 +329,76 @@ class RedisSessionManager:
             system_prompt=system_prompt
         )
         
-        self._save_thread(thread)
-        self._add_thread_to_user(user_id, thread_id, title, now)
+        if self.redis_client:
+            # Thread record and user index go out in one round-trip
+            try:
+                with self.redis_client.pipeline(transaction=False) as pipe:
+                    self._save_thread(thread, pipe)
+                    self._add_thread_to_user(user_id, thread_id, title, now, pipe)
+                    results = pipe.execute()
+                self._trim_user_threads(user_id, results[-1])
+            except Exception as e:
+                logger.error("Failed to create thread in Redis: %s", e)
+                self._memory_store[thread_id] = thread
+        else:
+            self._save_thread(thread)
         
         return thread_id
     
     def get_thread(self, thread_id: str) -> Optional[ChatThread]:
         """Get a chat thread by ID"""
         if self.redis_client:
+            thread = self._thread_cache.get(thread_id)
+            if thread is not None:
+                return thread
             try:
-                thread_data = self.redis_client.get(self._get_thread_key(thread_id))
-                if thread_data:
-                    return ChatThread.from_json(thread_data)
+                meta, messages_data = self._read_thread(thread_id)
+                if not meta and self._migrate_legacy_thread(thread_id):
+                    meta, messages_data = self._read_thread(thread_id)
+                if meta:
+                    thread = ChatThread(
+                        messages=[ChatMessage.from_msgpack(msg) for msg in messages_data],
+                        **{key.decode(): value.decode() for key, value in meta.items()}
+                    )
+                    self._thread_cache.put(thread)
+                    return thread
             except Exception as e:
-                print(f"[ERROR] Failed to get thread from Redis: {e}")
+                logger.error("Failed to get thread from Redis: %s", e)
         else:
             # Fallback to memory storage
             return self._memory_store.get(thread_id)
         
         return None
     
-    def _save_thread(self, thread: ChatThread):
-        """Save thread to storage"""
+    def _save_thread(self, thread: ChatThread, pipe=None):
+        """Save thread to storage, queueing on pipe instead of sending when one is given.
+        
+        In Redis only the metadata hash is written; messages are appended by add_message.
+        """
         thread.updated_at = datetime.now().isoformat()
         
         if self.redis_client:
             try:
-                # Save thread data
-                self.redis_client.setex(
+                meta = thread.meta_dict()
+                client = pipe or self.redis_client.pipeline(transaction=False)
+                client.hset(
                     self._get_thread_key(thread.thread_id),
-                    timedelta(days=30),  # Expire after 30 days
-                    thread.to_json()
+                    mapping={key: value for key, value in meta.items() if value is not None}
                 )
+                self._expire_thread(client, thread.thread_id)
+                if pipe is None:
+                    client.execute()
+                self._thread_cache.put(thread)
             except Exception as e:
-                print(f"[ERROR] Failed to save thread to Redis: {e}")
+                logger.error("Failed to save thread to Redis: %s", e)
                 # Fallback to memory
                 self._memory_store[thread.thread_id] = thread
         else:
             # Memory storage
             self._memory_store[thread.thread_id] = thread
     
-    def _add_thread_to_user(self, user_id: str, thread_id: str, title: str, created_at: str):
-        """Add thread to user's thread list"""
+    def _add_thread_to_user(self, user_id: str, thread_id: str, title: str, created_at: str, pipe=None):
+        """Add thread to user's thread list, queueing on pipe instead of sending when one is given"""
         if self.redis_client:
             try:
                 thread_info = {
@@ -161,20 +407,31 @@ class RedisSessionManager:
                     "created_at": created_at,
                     "updated_at": created_at
                 }
-                self.redis_client.lpush(self._get_user_threads_key(user_id), json.dumps(thread_info))
-                # Keep only last 100 threads per user
-                self.redis_client.ltrim(self._get_user_threads_key(user_id), 0, 99)
+                client = pipe or self.redis_client.pipeline(transaction=False)
+                self._index_thread(client, user_id, thread_info)
+                # Last queued command returns the ids past the newest MAX_USER_THREADS
+                client.zrange(self._get_user_threads_order_key(user_id), 0, -(MAX_USER_THREADS + 1))
+                if pipe is None:
+                    self._trim_user_threads(user_id, client.execute()[-1])
             except Exception as e:
-                print(f"[ERROR] Failed to add thread to user list: {e}")
+                logger.error("Failed to add thread to user list: %s", e)
     
     def get_user_threads(self, user_id: str = "default") -> List[Dict]:
         """Get all threads for a user"""
         if self.redis_client:
             try:
-                threads_data = self.redis_client.lrange(self._get_user_threads_key(user_id), 0, -1)
-                return [json.loads(thread_data) for thread_data in threads_data]
+                with self.redis_client.pipeline(transaction=False) as pipe:
+                    pipe.exists(self._get_legacy_user_threads_key(user_id))
+                    pipe.zrevrange(self._get_user_threads_order_key(user_id), 0, -1)
+                    has_legacy, thread_ids = pipe.execute()
+                if has_legacy and self._migrate_legacy_user_threads(user_id):
+                    thread_ids = self.redis_client.zrevrange(self._get_user_threads_order_key(user_id), 0, -1)
+                if not thread_ids:
+                    return []
+                threads_data = self.redis_client.hmget(self._get_user_threads_key(user_id), thread_ids)
+                return [orjson.loads(thread_data) for thread_data in threads_data if thread_data]
             except Exception as e:
-                print(f"[ERROR] Failed to get user threads: {e}")
+                logger.error("Failed to get user threads: %s", e)
         
         # Fallback: return all threads from memory
         return [
@@ -200,7 +457,21 @@ class RedisSessionManager:
         )
         
         thread.messages.append(message)
-        self._save_thread(thread)
+        if not self.redis_client:
+            self._save_thread(thread)
+            return message.message_id
+        
+        # Append only the new message instead of rewriting the whole history
+        thread.updated_at = message.timestamp
+        try:
+            with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.rpush(self._get_thread_messages_key(thread_id), message.to_msgpack())
+                pipe.hset(self._get_thread_key(thread_id), "updated_at", thread.updated_at)
+                self._expire_thread(pipe, thread_id)
+                pipe.execute()
+        except Exception as e:
+            logger.error("Failed to add message to Redis: %s", e)
+            self._memory_store[thread_id] = thread
         
         return message.message_id
     
@@ -211,51 +482,64 @@ class RedisSessionManager:
     
     def update_thread_title(self, thread_id: str, title: str, user_id: str = "default"):
         """Update thread title"""
-        thread = self.get_thread(thread_id)
-        if thread:
+        if not self.redis_client:
+            thread = self.get_thread(thread_id)
+            if thread:
+                thread.title = title
+                self._save_thread(thread)
+            return
+        
+        # One atomic round-trip: updates the thread and, if listed there, the user's index.
+        # Data still in a legacy layout costs one migration and retry, once.
+        now = datetime.now()
+        keys = [
+            self._get_thread_key(thread_id),
+            self._get_thread_messages_key(thread_id),
+            self._get_user_threads_key(user_id),
+            self._get_user_threads_order_key(user_id),
+            self._get_legacy_user_threads_key(user_id)
+        ]
+        args = [thread_id, title, now.isoformat(), now.timestamp(), int(THREAD_TTL.total_seconds())]
+        try:
+            updated = self._update_title_script(keys=keys, args=args)
+            if updated == -1:
+                self._migrate_legacy_user_threads(user_id)
+                updated = self._update_title_script(keys=keys, args=args)
+            if not updated and self._migrate_legacy_thread(thread_id):
+                updated = self._update_title_script(keys=keys, args=args)
+        except Exception as e:
+            logger.error("Failed to update thread title in Redis: %s", e)
+            return
+        
+        thread = self._thread_cache.get(thread_id)
+        if updated == 1 and thread is not None:
             thread.title = title
-            self._save_thread(thread)
-            
-            # Update in user's thread list
-            if self.redis_client:
-                try:
-                    threads_data = self.redis_client.lrange(self._get_user_threads_key(user_id), 0, -1)
-                    updated_threads = []
-                    for thread_data in threads_data:
-                        thread_info = json.loads(thread_data)
-                        if thread_info["thread_id"] == thread_id:
-                            thread_info["title"] = title
-                            thread_info["updated_at"] = datetime.now().isoformat()
-                        updated_threads.append(json.dumps(thread_info))
-                    
-                    # Replace the entire list
-                    self.redis_client.delete(self._get_user_threads_key(user_id))
-                    if updated_threads:
-                        self.redis_client.lpush(self._get_user_threads_key(user_id), *updated_threads)
-                except Exception as e:
-                    print(f"[ERROR] Failed to update thread title in user list: {e}")
+            thread.updated_at = now.isoformat()
     
     def delete_thread(self, thread_id: str, user_id: str = "default"):
         """Delete a thread"""
+        self._thread_cache.pop(thread_id)
         if self.redis_client:
             try:
-                # Delete thread data
-                self.redis_client.delete(self._get_thread_key(thread_id))
-                
-                # Remove from user's thread list
-                threads_data = self.redis_client.lrange(self._get_user_threads_key(user_id), 0, -1)
-                updated_threads = []
-                for thread_data in threads_data:
-                    thread_info = json.loads(thread_data)
-                    if thread_info["thread_id"] != thread_id:
-                        updated_threads.append(thread_data)
-                
-                # Replace the entire list
-                self.redis_client.delete(self._get_user_threads_key(user_id))
-                if updated_threads:
-                    self.redis_client.lpush(self._get_user_threads_key(user_id), *updated_threads)
+                # Delete thread data and remove it from the user's index in one round-trip
+                with self.redis_client.pipeline() as pipe:
+                    pipe.delete(
+                        self._get_thread_key(thread_id),
+                        self._get_thread_messages_key(thread_id),
+                        self._get_legacy_thread_key(thread_id)
+                    )
+                    pipe.hdel(self._get_user_threads_key(user_id), thread_id)
+                    pipe.zrem(self._get_user_threads_order_key(user_id), thread_id)
+                    pipe.exists(self._get_legacy_user_threads_key(user_id))
+                    has_legacy = pipe.execute()[-1]
+                # Migrating re-adds the thread from the legacy list, so remove it from the index again
+                if has_legacy and self._migrate_legacy_user_threads(user_id):
+                    with self.redis_client.pipeline() as pipe:
+                        pipe.hdel(self._get_user_threads_key(user_id), thread_id)
+                        pipe.zrem(self._get_user_threads_order_key(user_id), thread_id)
+                        pipe.execute()
             except Exception as e:
-                print(f"[ERROR] Failed to delete thread: {e}")
+                logger.error("Failed to delete thread: %s", e)
         else:
             # Memory storage
             if thread_id in self._memory_store:
@@ -263,20 +547,52 @@ class RedisSessionManager:
     
     def update_thread_config(self, thread_id: str, mcp_url: Optional[str] = None, system_prompt: Optional[str] = None):
         """Update thread configuration"""
-        thread = self.get_thread(thread_id)
-        if thread:
-            if mcp_url is not None:
-                thread.mcp_url = mcp_url
-            if system_prompt is not None:
-                thread.system_prompt = system_prompt
-            self._save_thread(thread)
+        changes = {"updated_at": datetime.now().isoformat()}
+        if mcp_url is not None:
+            changes["mcp_url"] = mcp_url
+        if system_prompt is not None:
+            changes["system_prompt"] = system_prompt
+        
+        if not self.redis_client:
+            thread = self.get_thread(thread_id)
+            if thread:
+                for field, value in changes.items():
+                    setattr(thread, field, value)
+                self._save_thread(thread)
+            return
+        
+        args = [int(THREAD_TTL.total_seconds())]
+        for field, value in changes.items():
+            args.extend((field, value))
+        keys = [self._get_thread_key(thread_id), self._get_thread_messages_key(thread_id)]
+        try:
+            updated = self._update_meta_script(keys=keys, args=args)
+            if not updated and self._migrate_legacy_thread(thread_id):
+                updated = self._update_meta_script(keys=keys, args=args)
+        except Exception as e:
+            logger.error("Failed to update thread config in Redis: %s", e)
+            return
+        
+        thread = self._thread_cache.get(thread_id)
+        if updated and thread is not None:
+            for field, value in changes.items():
+                setattr(thread, field, value)
     
     def clear_thread_messages(self, thread_id: str):
         """Clear all messages from a thread"""
         thread = self.get_thread(thread_id)
         if thread:
             thread.messages = []
-            self._save_thread(thread)
+            if not self.redis_client:
+                self._save_thread(thread)
+                return
+            try:
+                with self.redis_client.pipeline() as pipe:
+                    pipe.delete(self._get_thread_messages_key(thread_id))
+                    self._save_thread(thread, pipe)
+                    pipe.execute()
+            except Exception as e:
+                logger.error("Failed to clear thread messages in Redis: %s", e)
 
 # Global session manager instance
 session_manager = RedisSessionManager()